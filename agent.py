@@ -1,6 +1,5 @@
 import random
-from memory import get_state, set_state
-from extractor import extract_intel
+from config import AGENT_CONFIG
 
 CONFUSED = [
     "Wait… I don’t understand. Can you explain slowly?",
@@ -27,30 +26,82 @@ STALLING = [
     "Battery low, I’ll reply",
 ]
 
-def agent_reply(message, history, scam):
+# Conversation state machine
+# States are small ints so the transition table is a flat lookup indexed by
+# (state << 4) | signals, built once at import.
+STATES = ("confused", "cooperative", "verifying", "stalling")
+CONFUSED_S, COOPERATIVE_S, VERIFYING_S, STALLING_S = range(len(STATES))
+STATE_INDEX = {name: i for i, name in enumerate(STATES)}
+
+REPLIES = (CONFUSED, COOPERATIVE, VERIFYING, STALLING)
+
+# Signal bits
+SIG_PAYMENT = 1   # UPI id or bank account in the message
+SIG_LINK = 2      # URL in the message
+SIG_DWELL = 4     # dwell limit for the current state reached
+SIG_PERSONA = 8   # persona_switch_interval turn boundary
+
+# Non-stalling states rotate on a persona switch (see prompts.PERSONAS)
+PERSONA_NEXT = {
+    CONFUSED_S: COOPERATIVE_S,
+    COOPERATIVE_S: VERIFYING_S,
+    VERIFYING_S: CONFUSED_S,
+}
+
+def _next_state(state, signals):
+    # Dwell comes first so a scammer repeating the same UPI id still gets
+    # stalled; a stall runs its full stall_turns before anything else applies
+    if state == STALLING_S:
+        if not signals & SIG_DWELL:
+            return STALLING_S
+    elif signals & SIG_DWELL:
+        return STALLING_S
+    if signals & SIG_PAYMENT:
+        return VERIFYING_S
+    if signals & SIG_LINK:
+        return COOPERATIVE_S
+    if state == STALLING_S:
+        return CONFUSED_S
+    if signals & SIG_PERSONA:
+        return PERSONA_NEXT[state]
+    return state
+
+TRANSITIONS = bytes(
+    _next_state(state, signals)
+    for state in range(len(STATES))
+    for signals in range(16)
+)
+
+DWELL_LIMITS = tuple(
+    AGENT_CONFIG["stall_turns"] if i == STALLING_S else AGENT_CONFIG["max_state_dwell"]
+    for i in range(len(STATES))
+)
+
+def advance_state(session, extracted):
+    """Apply one turn to the session's state and dwell counter in place"""
+    state = STATE_INDEX.get(session.get("state"), CONFUSED_S)
+    dwell = session.get("dwell", 0)
+    turn = len(session.get("history", [])) + 1
+
+    signals = 0
+    if extracted.get("upi") or extracted.get("bank_accounts"):
+        signals |= SIG_PAYMENT
+    if extracted.get("links"):
+        signals |= SIG_LINK
+    if dwell >= DWELL_LIMITS[state]:
+        signals |= SIG_DWELL
+    if turn % AGENT_CONFIG["persona_switch_interval"] == 0:
+        signals |= SIG_PERSONA
+
+    new_state = TRANSITIONS[(state << 4) | signals]
+    session["state"] = STATES[new_state]
+    session["dwell"] = dwell + 1 if new_state == state else 1
+    return new_state
+
+def agent_reply(session, scam, extracted):
+    """Pick a reply and advance the session record (caller persists it)"""
     if not scam:
         return "Okay, thanks for letting me know."
 
-    extracted = extract_intel(message)
-    session_id = history[0][0] if history else "default"
-
-    state = get_state(session_id)
-
-    if extracted["upi"] or extracted["bank_accounts"]:
-        state = "verifying"
-    elif extracted["links"]:
-        state = "cooperative"
-    elif len(history) > 6:
-        state = "stalling"
-    else:
-        state = "confused"
-
-    set_state(session_id, state)
-
-    if state == "confused":
-        return random.choice(CONFUSED)
-    if state == "cooperative":
-        return random.choice(COOPERATIVE)
-    if state == "verifying":
-        return random.choice(VERIFYING)
-    return random.choice(STALLING)
+    state = advance_state(session, extracted)
+    return random.choice(REPLIES[state])
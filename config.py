@@ -34,7 +34,9 @@ AGENT_CONFIG = {
     "confusion_probability": 0.2,
     "stalling_probability": 0.1,
     "max_conversation_history": 20,
-    "persona_switch_interval": 10  # turns
+    "persona_switch_interval": 10,  # turns
+    "max_state_dwell": 6,  # turns in one state before stalling
+    "stall_turns": 2  # turns spent stalling before resuming
 }
 
 # Detection Configuration
@@ -64,6 +66,37 @@ EXTRACTION_CONFIG = {
     "min_confidence_score": 0.6
 }
 
+# Rate Limiting Configuration
+RATE_LIMIT_CONFIG = {
+    "session_rate_per_second": 1.0,
+    "session_burst": 5,
+    "ip_rate_per_second": 5.0,
+    "ip_burst": 20,
+    "max_tracked_keys": 10000,
+    # Counted before a threadpool worker is taken, so it covers requests
+    # queued for the threadpool (40 workers by default) as well as running ones
+    "max_in_flight": 64,
+    # Peers whose X-Forwarded-For is trusted, comma separated ("*" = any peer,
+    # e.g. behind Render's proxy). Without this every client shares the proxy IP
+    "trusted_proxies": [p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()]
+}
+
+# Time-series Metrics Configuration (ring sizes, in buckets)
+TIMESERIES_CONFIG = {
+    "minute_buckets": 180,  # 3 hours
+    "hour_buckets": 168,  # 7 days
+    "day_buckets": 90
+}
+
+# Profiling Configuration (admin endpoints are disabled without a token)
+PROFILING_CONFIG = {
+    "admin_token": os.getenv("ADMIN_TOKEN", ""),
+    "slow_request_ms": float(os.getenv("SLOW_REQUEST_MS", 250)),
+    "slow_trace_buffer": 100,
+    "max_profile_seconds": 30,
+    "sample_interval_ms": 5
+}
+
 # Mock Scammer API Configuration (for testing)
 MOCK_SCAMMER_CONFIG = {
     "base_url": os.getenv("MOCK_SCAMMER_URL", "http://localhost:8080"),
@@ -94,6 +127,9 @@ def get_config() -> Dict:
         "detection": DETECTION_CONFIG,
         "memory": MEMORY_CONFIG,
         "extraction": EXTRACTION_CONFIG,
+        "rate_limit": RATE_LIMIT_CONFIG,
+        "timeseries": TIMESERIES_CONFIG,
+        "profiling": {k: v for k, v in PROFILING_CONFIG.items() if k != "admin_token"},
         "mock_scammer": MOCK_SCAMMER_CONFIG,
         "logging": LOG_CONFIG
     }
@@ -113,5 +149,8 @@ def validate_config() -> List[str]:
     
     if DETECTION_CONFIG["scam_threshold"] <= 0 or DETECTION_CONFIG["scam_threshold"] >= 1:
         issues.append("scam_threshold must be between 0 and 1")
-    
+
+    if RATE_LIMIT_CONFIG["max_in_flight"] <= 0:
+        issues.append("max_in_flight must be positive")
+
     return issues
\ No newline at end of file
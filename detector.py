@@ -5,10 +5,17 @@ KEYWORDS = [
     "click","call","suspended","warning","final","now","immediately"
 ]
 
+# Common Hinglish scam phrasing (romanized Hindi)
+HINGLISH_KEYWORDS = [
+    "turant","jaldi","khata","band ho","bhejo","paise","paisa",
+    "inaam","lottery","otp batao","otp bhejo"
+]
+
 def is_scam(text: str) -> bool:
+    """Expects text already passed through normalize.normalize"""
     t = text.lower()
 
-    if any(k in t for k in KEYWORDS):
+    if any(k in t for k in KEYWORDS) or any(k in t for k in HINGLISH_KEYWORDS):
         return True
 
     if re.search(r"https?://", t):
@@ -0,0 +1,123 @@
+"""
+In-process event bus
+/chat publishes turn events here; a consumer task folds them into the
+in-memory metrics and fans them out to live (SSE) subscribers.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from metrics import metrics_tracker
+from timeseries import timeseries_tracker
+
+EVENT_QUEUE_SIZE = 10000
+SUBSCRIBER_QUEUE_SIZE = 100
+FLUSH_INTERVAL_SECONDS = 30
+KEEPALIVE_SECONDS = 15
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._subscribers: List[asyncio.Queue] = []
+        self._consumer: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+
+    async def start(self):
+        """Bind to the running loop and start the consumer task"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        if self._consumer:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+        metrics_tracker.flush()
+
+    def publish(self, event: Dict[str, Any]):
+        """Publish an event; safe to call from threadpool workers"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        event.setdefault("ts", time.time())
+        self._loop.call_soon_threadsafe(self._enqueue, event)
+
+    def _enqueue(self, event: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(event)
+            self.published += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _consume(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                event = await asyncio.wait_for(self._queue.get(), FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                event = None
+
+            if event is not None:
+                # One bad event must not end the consumer for the process lifetime
+                try:
+                    metrics_tracker.record_event(event)
+                    timeseries_tracker.record_event(event)
+                except Exception:
+                    logger.exception("Failed to record event %r", event)
+                for sub in self._subscribers:
+                    try:
+                        sub.put_nowait(event)
+                    except asyncio.QueueFull:
+                        # Slow dashboard; drop rather than stall the consumer
+                        pass
+
+            if time.monotonic() - last_flush >= FLUSH_INTERVAL_SECONDS:
+                try:
+                    await asyncio.to_thread(metrics_tracker.flush)
+                except Exception:
+                    logger.exception("Failed to flush metrics")
+                last_flush = time.monotonic()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def get_stats(self) -> Dict:
+        return {
+            "published": self.published,
+            "dropped": self.dropped,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "subscribers": len(self._subscribers)
+        }
+
+
+# Initialize event bus
+event_bus = EventBus()
+
+
+async def sse_stream(queue: asyncio.Queue):
+    """Format subscriber events as Server-Sent Events"""
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        event_bus.unsubscribe(queue)
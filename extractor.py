@@ -1,9 +1,23 @@
 import re
 
-def extract_intel(text: str):
+from normalize import NormalizedText
+
+def extract_intel(text):
+    """Accepts a str or a normalize.NormalizedText"""
+    source = None
+    if isinstance(text, NormalizedText):
+        source, text = text, text.text
+
     phones = re.findall(r"(?:\+91[\s\-]?)?[6-9]\d{9}", text)
-    upi = re.findall(r"[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}", text)
-    links = re.findall(r"https?://\S+", text)
+
+    # Report UPI ids and links exactly as sent; a homoglyph domain or
+    # full-width handle is itself the indicator
+    if source is None:
+        upi = re.findall(r"[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}", text)
+        links = re.findall(r"https?://\S+", text)
+    else:
+        upi = [source.original_substring(*m.span()) for m in re.finditer(r"[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}", text)]
+        links = [source.original_substring(*m.span()) for m in re.finditer(r"https?://\S+", text)]
 
     # First find all 9–18 digit numbers
     raw_accounts = re.findall(r"\b\d{9,18}\b", text)
@@ -1,13 +1,25 @@
-from fastapi import FastAPI
+import asyncio
+import math
+import random
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
 from detector import is_scam
-from agent import agent_reply
-from memory import get_history, save_turn
+from agent import agent_reply, STALLING
+from memory import get_session, save_turn
 from extractor import extract_intel, validate_extractions
+from normalize import normalize
+from ratelimit import admit, client_ip, get_rate_limit_stats
+from events import event_bus, sse_stream
+from metrics import get_system_stats, get_leaderboard, get_conversation_metrics
+from timeseries import get_timeseries
+from profiler import RequestTrace, is_admin, collapsed_stacks, get_slow_traces
 
 app = FastAPI()
 
@@ -21,35 +33,91 @@ app.add_middleware(
 
 app.mount("/ui", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+async def startup():
+    await event_bus.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await event_bus.stop()
+
 class Message(BaseModel):
     session_id: str
     message: str
 
 @app.post("/chat")
-def chat(req: Message):
-    history = get_history(req.session_id)
+async def chat(req: Message, request: Request):
+    peer = request.client.host if request.client else None
+    ip = client_ip(peer, request.headers.get("x-forwarded-for"))
 
-    # 1) Detect scam
-    scam = is_scam(req.message)
+    # 0) Rate limit on the event loop, before a threadpool worker is taken —
+    #    over the limit gets a cheap stall, no storage touched
+    with admit(req.session_id, ip) as allowed:
+        if not allowed:
+            event_bus.publish({"type": "throttled", "session_id": req.session_id})
+            return {
+                "reply": random.choice(STALLING),
+                "scam": None,  # never classified
+                "extracted": {},
+                "throttled": True
+            }
+        # Started here so time spent waiting for a worker shows as "queue"
+        trace = RequestTrace("chat")
+        try:
+            return await run_in_threadpool(_handle_chat, req, trace)
+        finally:
+            trace.finish()
+
+def _handle_chat(req: Message, trace: RequestTrace):
+    trace.mark("queue")
+    session = get_session(req.session_id)
+    new_session = not session["history"]
+    trace.mark("load")
 
-    # 2) Generate reply (correct call — DO NOT pass session_id here)
-    reply = agent_reply(req.message, history, scam)
+    # 0) Normalize once (homoglyphs, full-width digits, "v e r i f y", ...)
+    normalized = normalize(req.message)
+    trace.mark("normalize")
 
-    # 3) Extract + VALIDATE intelligence
+    # 1) Detect scam
+    scam = is_scam(normalized.text)
+    trace.mark("detect")
+
+    # 2) Extract + VALIDATE intelligence
     if scam:
-        raw_extracted = extract_intel(req.message)
+        raw_extracted = extract_intel(normalized)
         extracted = validate_extractions(raw_extracted)
     else:
         extracted = {}
+    trace.mark("extract")
 
+    # Flag kept in the session record so metrics count each scam session once
+    new_scam = scam and not session.get("is_scam", False)
+    if new_scam:
+        session["is_scam"] = True
 
-    # 4) PRIORITY RULE: phones beat bank accounts (CRITICAL)
+    # 3) PRIORITY RULE: phones beat bank accounts (CRITICAL) — before the
+    #    agent sees them, so a phone number is never taken as a payment
     if extracted.get("phones"):
         extracted.pop("bank_accounts", None)
 
+    # 4) Generate reply — advances the session's state machine in place
+    reply = agent_reply(session, scam, extracted)
+    trace.mark("reply")
 
-    # 5) Save turn
-    save_turn(req.session_id, req.message, reply)
+    # 5) Save turn together with the updated state
+    save_turn(req.session_id, req.message, reply, session)
+    trace.mark("save")
+
+    # 6) Publish for metrics / live dashboards
+    event_bus.publish({
+        "type": "turn",
+        "session_id": req.session_id,
+        "scam": scam,
+        "new_session": new_session,
+        "new_scam": new_scam,
+        "extracted": extracted
+    })
+    trace.mark("publish")
 
     return {
         "reply": reply,
@@ -57,6 +125,67 @@ def chat(req: Message):
         "extracted": extracted
     }
 
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "stats": get_system_stats(),
+        "events": event_bus.get_stats(),
+        "rate_limit": get_rate_limit_stats()
+    }
+
+@app.get("/stats")
+async def stats():
+    return get_system_stats()
+
+@app.get("/leaderboard")
+async def leaderboard(top_n: int = 10):
+    return get_leaderboard(top_n)
+
+@app.get("/session/{session_id}/metrics")
+async def session_metrics(session_id: str):
+    return get_conversation_metrics(session_id)
+
+@app.get("/metrics/timeseries")
+async def timeseries(series: str = "messages", resolution: str = "minute",
+                     window: Optional[int] = None, start: Optional[float] = None,
+                     end: Optional[float] = None):
+    try:
+        return get_timeseries(series, resolution, start, end, window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/events/stream")
+async def events_stream():
+    return StreamingResponse(
+        sse_stream(event_bus.subscribe()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def _require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(seconds: float = 5, interval_ms: Optional[float] = None,
+                        x_admin_token: Optional[str] = Header(None)):
+    """Collapsed stacks for all threads, ready for flamegraph.pl / speedscope"""
+    _require_admin(x_admin_token)
+    if not (math.isfinite(seconds) and seconds > 0):
+        raise HTTPException(status_code=400, detail="seconds must be a positive number")
+    if interval_ms is not None and not (math.isfinite(interval_ms) and interval_ms > 0):
+        raise HTTPException(status_code=400, detail="interval_ms must be a positive number")
+    stacks = await asyncio.to_thread(collapsed_stacks, seconds, interval_ms)
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="Profile already running")
+    return stacks
+
+@app.get("/admin/slow")
+async def admin_slow(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    return get_slow_traces()
+
 @app.get("/")
 def serve_ui():
     return FileResponse("static/ui.html")
@@ -1,9 +1,13 @@
 import json
 import os
+import threading
 from datetime import datetime
 
 MEMORY_FILE = "memory.json"
 
+# Serializes read-modify-write cycles; /chat handlers run on many threads
+_lock = threading.Lock()
+
 def _load():
     if not os.path.exists(MEMORY_FILE):
         return {}
@@ -11,25 +15,39 @@ def _load():
         return json.load(f)
 
 def _save(data):
-    with open(MEMORY_FILE, "w") as f:
+    # Write a temp file and swap it in so readers never see a partial file
+    tmp = f"{MEMORY_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
         json.dump(data, f)
+    os.replace(tmp, MEMORY_FILE)
 
-def get_session(session_id):
-    data = _load()
-    return data.get(session_id, {
+def _new_session():
+    return {
         "history": [],
-        "state": "confused"
-    })
+        "state": "confused",
+        "dwell": 0,
+        "is_scam": False
+    }
 
-def save_turn(session_id, user, bot):
+def get_session(session_id):
     data = _load()
-    session = data.get(session_id, {
-        "history": [],
-        "state": "confused"
-    })
-    session["history"].append((user, bot))
-    data[session_id] = session
-    _save(data)
+    return data.get(session_id, _new_session())
+
+def save_turn(session_id, user, bot, session=None):
+    """Append a turn; pass the session already in hand to save its state too"""
+    with _lock:
+        data = _load()
+        # Re-read the stored record so overlapping requests don't drop each
+        # other's turns; only the state fields come from the in-hand copy
+        stored = data.get(session_id, _new_session())
+        if session is not None:
+            stored["state"] = session["state"]
+            stored["dwell"] = session.get("dwell", 0)
+            if session.get("is_scam"):
+                stored["is_scam"] = True
+        stored["history"].append((user, bot))
+        data[session_id] = stored
+        _save(data)
 
 def get_history(session_id):
     return get_session(session_id)["history"]
@@ -38,8 +56,9 @@ def get_state(session_id):
     return get_session(session_id)["state"]
 
 def set_state(session_id, state):
-    data = _load()
-    session = data.get(session_id, {"history": [], "state": "confused"})
-    session["state"] = state
-    data[session_id] = session
-    _save(data)
+    with _lock:
+        data = _load()
+        session = data.get(session_id, _new_session())
+        session["state"] = state
+        data[session_id] = session
+        _save(data)
@@ -6,36 +6,53 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any
 import json
 import os
+import threading
 from collections import defaultdict
 
+from config import MEMORY_CONFIG
+
 class HackathonMetrics:
     def __init__(self):
         self.metrics_file = "hackathon_metrics.json"
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.max_sessions = MEMORY_CONFIG["max_sessions"]
         self._initialize_metrics()
+        # Loaded once; all reads after this are served from memory
+        self._metrics = self._load_metrics()
+    
+    def _base_metrics(self) -> Dict:
+        return {
+            "total_sessions": 0,
+            "total_messages": 0,
+            "scam_sessions": 0,
+            "throttled_requests": 0,
+            "total_engagement_time": 0,
+            "extraction_counts": defaultdict(int),
+            "session_metrics": {},
+            "start_time": datetime.now().isoformat(),
+            "last_update": datetime.now().isoformat()
+        }
     
     def _initialize_metrics(self):
         """Initialize metrics storage"""
         if not os.path.exists(self.metrics_file):
-            base_metrics = {
-                "total_sessions": 0,
-                "total_messages": 0,
-                "scam_sessions": 0,
-                "total_engagement_time": 0,
-                "extraction_counts": defaultdict(int),
-                "conversation_lengths": [],
-                "session_metrics": {},
-                "start_time": datetime.now().isoformat(),
-                "last_update": datetime.now().isoformat()
-            }
-            self._save_metrics(base_metrics)
+            self._save_metrics(self._base_metrics())
     
     def _load_metrics(self) -> Dict:
         """Load metrics from file"""
         try:
             with open(self.metrics_file, 'r') as f:
-                return json.load(f)
-        except:
-            return self._initialize_metrics()
+                metrics = json.load(f)
+        except (OSError, ValueError):
+            metrics = self._base_metrics()
+        for key, value in self._base_metrics().items():
+            metrics.setdefault(key, value)
+        # Keep only the most recently updated sessions
+        sessions = metrics["session_metrics"]
+        if len(sessions) > self.max_sessions:
+            metrics["session_metrics"] = dict(list(sessions.items())[-self.max_sessions:])
+        return metrics
     
     def _save_metrics(self, metrics: Dict):
         """Save metrics to file"""
@@ -46,78 +63,152 @@ class HackathonMetrics:
         with open(self.metrics_file, 'w') as f:
             json.dump(metrics, f, indent=2)
     
-    def update_session_metrics(self, session_id: str, metrics: Dict):
-        """Update metrics for a specific session"""
-        all_metrics = self._load_metrics()
-        
-        # Update overall metrics
-        all_metrics["total_sessions"] += 1
-        all_metrics["total_messages"] += metrics.get("message_count", 0)
-        
-        if metrics.get("is_scam", False):
-            all_metrics["scam_sessions"] += 1
-        
-        all_metrics["total_engagement_time"] += metrics.get("engagement_duration", 0)
-        
-        # Update extraction counts
-        extractions = metrics.get("extractions", {})
-        for key, items in extractions.items():
-            if items:
-                all_metrics["extraction_counts"][key] = all_metrics["extraction_counts"].get(key, 0) + len(items)
+    def flush(self):
+        """Persist in-memory metrics if anything changed since the last flush"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Session records are replaced, never mutated, once stored (see
+            # update_session_metrics), so shallow copies are a consistent
+            # snapshot and serialization can happen outside the lock
+            snapshot = dict(self._metrics)
+            snapshot["extraction_counts"] = dict(self._metrics["extraction_counts"])
+            snapshot["session_metrics"] = dict(self._metrics["session_metrics"])
+            self._dirty = False
+        try:
+            self._save_metrics(snapshot)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+    
+    def record_event(self, event: Dict):
+        """Fold a single event from the event bus into the aggregates"""
+        if event.get("type") == "throttled":
+            with self._lock:
+                self._metrics["throttled_requests"] += 1
+                self._dirty = True
+            return
         
-        # Track conversation length
-        all_metrics["conversation_lengths"].append(metrics.get("message_count", 0))
+        if event.get("type") != "turn":
+            return
         
-        # Keep only last 1000 conversation lengths
-        if len(all_metrics["conversation_lengths"]) > 1000:
-            all_metrics["conversation_lengths"] = all_metrics["conversation_lengths"][-1000:]
+        self.update_session_metrics(event["session_id"], {
+            "is_scam": event.get("scam", False),
+            "new_session": event.get("new_session"),
+            "new_scam": event.get("new_scam"),
+            "extractions": event.get("extracted", {}),
+            "message_count": 1,
+            "ts": event.get("ts", time.time())
+        })
+    
+    def update_session_metrics(self, session_id: str, metrics: Dict):
+        """Update metrics for a specific session
         
-        # Store session-specific metrics
-        all_metrics["session_metrics"][session_id] = {
-            **metrics,
-            "timestamp": datetime.now().isoformat()
-        }
+        Totals are counted from the "new_session" / "new_scam" facts when the
+        caller supplies them (/chat knows them from the stored session), since
+        session_metrics is capped and an evicted session can come back.
+        """
+        ts = metrics.get("ts", time.time())
         
-        all_metrics["last_update"] = datetime.now().isoformat()
-        self._save_metrics(all_metrics)
+        with self._lock:
+            all_metrics = self._metrics
+            sessions = all_metrics["session_metrics"]
+            previous = sessions.pop(session_id, None)
+            
+            if previous is None:
+                session = {
+                    "is_scam": False,
+                    "extractions": {},
+                    "message_count": 0,
+                    "engagement_duration": 0,
+                    "first_seen": ts
+                }
+            else:
+                # Copy-on-write so a snapshot taken by flush() stays unchanged
+                session = dict(previous)
+                session["extractions"] = {k: list(v) for k, v in previous.get("extractions", {}).items()}
+            
+            # Re-insert at the end: dict order doubles as LRU for eviction
+            sessions[session_id] = session
+            while len(sessions) > self.max_sessions:
+                sessions.pop(next(iter(sessions)))
+            
+            new_session = metrics.get("new_session")
+            if new_session is None:
+                new_session = previous is None
+            if new_session:
+                all_metrics["total_sessions"] += 1
+            
+            all_metrics["total_messages"] += metrics.get("message_count", 0)
+            session["message_count"] = session.get("message_count", 0) + metrics.get("message_count", 0)
+            
+            new_scam = metrics.get("new_scam")
+            if new_scam is None:
+                new_scam = metrics.get("is_scam", False) and not session.get("is_scam")
+            if metrics.get("is_scam", False):
+                session["is_scam"] = True
+            if new_scam:
+                all_metrics["scam_sessions"] += 1
+            
+            # Engagement is wall-clock minutes from the first message
+            duration = round((ts - session.setdefault("first_seen", ts)) / 60, 2)
+            duration = max(duration, session.get("engagement_duration", 0))
+            all_metrics["total_engagement_time"] += duration - session.get("engagement_duration", 0)
+            session["engagement_duration"] = duration
+            
+            # Update extraction counts with newly seen items only
+            counts = all_metrics["extraction_counts"]
+            for key, items in metrics.get("extractions", {}).items():
+                known = session.setdefault("extractions", {}).setdefault(key, [])
+                for item in items:
+                    if item not in known:
+                        known.append(item)
+                        counts[key] = counts.get(key, 0) + 1
+            
+            session["timestamp"] = datetime.fromtimestamp(ts).isoformat()
+            all_metrics["last_update"] = session["timestamp"]
+            self._dirty = True
     
     def get_overall_metrics(self) -> Dict[str, Any]:
         """Get overall system metrics"""
-        metrics = self._load_metrics()
-        
-        # Calculate derived metrics
-        avg_conversation_length = 0
-        if metrics["conversation_lengths"]:
-            avg_conversation_length = sum(metrics["conversation_lengths"]) / len(metrics["conversation_lengths"])
-        
-        scam_rate = 0
-        if metrics["total_sessions"] > 0:
-            scam_rate = (metrics["scam_sessions"] / metrics["total_sessions"]) * 100
-        
-        avg_engagement = 0
-        if metrics["total_sessions"] > 0:
-            avg_engagement = metrics["total_engagement_time"] / metrics["total_sessions"]
-        
-        return {
-            "total_sessions": metrics["total_sessions"],
-            "total_messages": metrics["total_messages"],
-            "scam_sessions": metrics["scam_sessions"],
-            "scam_rate_percentage": round(scam_rate, 2),
-            "avg_conversation_length": round(avg_conversation_length, 2),
-            "avg_engagement_minutes": round(avg_engagement, 2),
-            "total_extractions": dict(metrics.get("extraction_counts", {})),
-            "extraction_efficiency": self._calculate_extraction_efficiency(metrics),
-            "system_uptime_hours": self._calculate_uptime_hours(metrics),
-            "active_sessions": len(metrics.get("session_metrics", {}))
-        }
+        with self._lock:
+            metrics = self._metrics
+            
+            # Calculate derived metrics
+            avg_conversation_length = 0
+            if metrics["total_sessions"] > 0:
+                avg_conversation_length = metrics["total_messages"] / metrics["total_sessions"]
+            
+            scam_rate = 0
+            if metrics["total_sessions"] > 0:
+                scam_rate = (metrics["scam_sessions"] / metrics["total_sessions"]) * 100
+            
+            avg_engagement = 0
+            if metrics["total_sessions"] > 0:
+                avg_engagement = metrics["total_engagement_time"] / metrics["total_sessions"]
+            
+            return {
+                "total_sessions": metrics["total_sessions"],
+                "total_messages": metrics["total_messages"],
+                "scam_sessions": metrics["scam_sessions"],
+                "throttled_requests": metrics["throttled_requests"],
+                "scam_rate_percentage": round(scam_rate, 2),
+                "avg_conversation_length": round(avg_conversation_length, 2),
+                "avg_engagement_minutes": round(avg_engagement, 2),
+                "total_extractions": dict(metrics.get("extraction_counts", {})),
+                "extraction_efficiency": self._calculate_extraction_efficiency(metrics),
+                "system_uptime_hours": self._calculate_uptime_hours(metrics),
+                "active_sessions": len(metrics.get("session_metrics", {}))
+            }
     
     def get_session_leaderboard(self, top_n: int = 10) -> List[Dict]:
         """Get leaderboard of best sessions by extraction score"""
-        metrics = self._load_metrics()
-        session_data = metrics.get("session_metrics", {})
+        with self._lock:
+            session_data = list(self._metrics["session_metrics"].items())
         
         scored_sessions = []
-        for session_id, data in session_data.items():
+        for session_id, data in session_data:
             score = self._calculate_session_score(data)
             scored_sessions.append({
                 "session_id": session_id,
@@ -132,6 +223,12 @@ class HackathonMetrics:
         scored_sessions.sort(key=lambda x: x["score"], reverse=True)
         return scored_sessions[:top_n]
     
+    def get_conversation_metrics(self, session_id: str) -> Dict:
+        """Get metrics for a specific session"""
+        with self._lock:
+            data = self._metrics["session_metrics"].get(session_id)
+            return json.loads(json.dumps(data)) if data else {}
+    
     def _calculate_session_score(self, session_data: Dict) -> float:
         """Calculate score for a session (for hackathon evaluation)"""
         score = 0.0
@@ -197,14 +294,12 @@ def update_metrics(session_id: str, is_scam: bool, extractions: Dict):
     metrics_tracker.update_session_metrics(session_id, {
         "is_scam": is_scam,
         "extractions": extractions,
-        "message_count": 1,  # This should be incremented per message
-        "engagement_duration": 0.5  # Estimated 30 seconds per message
+        "message_count": 1
     })
 
 def get_conversation_metrics(session_id: str) -> Dict:
     """Get metrics for a specific conversation"""
-    metrics = metrics_tracker._load_metrics()
-    return metrics.get("session_metrics", {}).get(session_id, {})
+    return metrics_tracker.get_conversation_metrics(session_id)
 
 def get_leaderboard(top_n: int = 10) -> List[Dict]:
     """Get hackathon leaderboard"""
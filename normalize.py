@@ -0,0 +1,255 @@
+"""
+Text normalization ahead of detection and extraction
+Folds homoglyphs, full-width forms and non-ASCII digits with a single
+precomputed str.translate table, then collapses obfuscating separators
+("v e r i f y", "98765 43210"). Keeps a map back to original offsets.
+"""
+import re
+import unicodedata
+from array import array
+from typing import List, Optional, Tuple
+
+# Look-alikes that NFKD does not fold to ASCII
+HOMOGLYPHS = {
+    # Cyrillic
+    "а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "у": "y", "х": "x",
+    "і": "i", "ј": "j", "ү": "y", "ѕ": "s", "һ": "h", "ԁ": "d", "ԛ": "q", "ԝ": "w",
+    "А": "A", "В": "B", "Е": "E", "К": "K", "М": "M", "Н": "H", "О": "O",
+    "Р": "P", "С": "C", "Т": "T", "Х": "X", "Ү": "Y", "І": "I", "Ј": "J", "Ѕ": "S",
+    # Greek
+    "α": "a", "ο": "o", "ι": "i", "ν": "v", "ρ": "p", "κ": "k", "τ": "t",
+    "Α": "A", "Β": "B", "Ε": "E", "Η": "H", "Ι": "I", "Κ": "K", "Μ": "M",
+    "Ν": "N", "Ο": "O", "Ρ": "P", "Τ": "T", "Χ": "X", "Υ": "Y", "Ζ": "Z",
+    # Currency and at-sign variants
+    "₨": "₹", "﹫": "@", "＠": "@",
+}
+
+# Invisible characters used to break up keywords
+INVISIBLE = "\u00ad\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff"
+
+# Blocks scanned once at import for compatibility forms and foreign digits
+SCAN_RANGES = [
+    (0x00A0, 0x024F),    # Latin-1 and Latin Extended (accents, NBSP)
+    (0x0660, 0x0DEF),    # Arabic-Indic, Devanagari, Bengali, ... digits
+    (0x2000, 0x215F),    # spaces, punctuation, super/subscripts, letterlike
+    (0x2460, 0x24FF),    # enclosed alphanumerics
+    (0x3000, 0x3000),    # ideographic space
+    (0xFE50, 0xFE6F),    # small form variants
+    (0xFF00, 0xFFEF),    # full-width forms
+    (0x1D400, 0x1D7FF),  # mathematical alphanumerics
+]
+
+
+def _build_table():
+    table = {}
+    for lo, hi in SCAN_RANGES:
+        for cp in range(lo, hi + 1):
+            ch = chr(cp)
+            digit = unicodedata.decimal(ch, None)
+            if digit is not None:
+                table[cp] = str(digit)
+                continue
+            folded = "".join(c for c in unicodedata.normalize("NFKD", ch)
+                             if not unicodedata.combining(c))
+            if len(folded) == 1 and folded != ch and " " <= folded <= "~":
+                table[cp] = folded
+    for src, dst in HOMOGLYPHS.items():
+        table[ord(src)] = dst
+    for ch in INVISIBLE:
+        table[ord(ch)] = None
+    return table
+
+
+FOLD_TABLE = _build_table()
+DELETED = frozenset(chr(cp) for cp, v in FOLD_TABLE.items() if v is None)
+
+
+def _build_charset(codepoints):
+    """Compact regex character class for a set of codepoints"""
+    ranges = []
+    for cp in sorted(codepoints):
+        if ranges and ranges[-1][1] == cp - 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return "[" + "".join(
+        re.escape(chr(lo)) if lo == hi else f"{re.escape(chr(lo))}-{re.escape(chr(hi))}"
+        for lo, hi in ranges
+    ) + "]"
+
+
+# Charset test is far cheaper than a dict-driven translate that changes nothing
+FOLDABLE_RE = re.compile(_build_charset(FOLD_TABLE))
+
+SEPARATORS = " .\\-_*"
+# Phone-shaped digit runs with separators: "98765 43210", "+91.98765.43210"
+SPLIT_PHONE_RE = re.compile(rf"(?<!\d)(?:\+?91[{SEPARATORS}]?)?[6-9](?:[{SEPARATORS}]?\d){{9}}(?!\d)")
+SEPARATOR_CHARS = frozenset(" .-_*")
+LETTERS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+# Cheap prefilters. Spaced-out words ("v e r i f y", four or more single
+# letters) are then walked by hand; digit runs are checked as phones
+LETTER_HINT_RE = re.compile(f"[{SEPARATORS}][A-Za-z][{SEPARATORS}]")
+DIGIT_RUN_RE = re.compile(f"\\d[\\d{SEPARATORS}]{{8,}}\\d")
+# A "." followed by a TLD-like label ends a domain: "www.a-b-c-d.com/x"
+DOMAIN_RE = re.compile(r"\.[A-Za-z]{2,}(?:[/:?#]|\W*$)")
+
+
+class NormalizedText:
+    """Normalized text plus a map from its offsets back to the original"""
+
+    __slots__ = ("text", "original", "_folded", "_spans", "_offsets")
+
+    def __init__(self, text: str, original: str, folded: str, spans: List[Tuple[int, int]]):
+        self.text = text
+        self.original = original
+        # The offset map is only needed when a caller asks for it, so keep
+        # what is required to build it (folded text + collapsed spans)
+        self._folded = folded
+        self._spans = spans
+        self._offsets = None
+
+    def _build_offsets(self) -> Optional[array]:
+        """None means offsets are unchanged (identity map)"""
+        if self._offsets is None:
+            if len(self._folded) != len(self.original):
+                offsets = array("i", (i for i, c in enumerate(self.original) if c not in DELETED))
+            elif self._spans:
+                offsets = array("i", range(len(self._folded)))
+            else:
+                return None
+
+            if self._spans:
+                folded = self._folded
+                collapsed = array("i")
+                pos = 0
+                for start, end in self._spans:
+                    collapsed.extend(offsets[pos:start])
+                    collapsed.extend(offsets[i] for i in range(start, end)
+                                     if folded[i] not in SEPARATOR_CHARS)
+                    pos = end
+                collapsed.extend(offsets[pos:])
+                offsets = collapsed
+            self._offsets = offsets
+        return self._offsets
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a [start, end) span of .text to the matching span of .original"""
+        offsets = self._build_offsets()
+        if offsets is None:
+            return start, end
+        if start >= end:
+            pos = offsets[start] if start < len(offsets) else len(self.original)
+            return pos, pos
+        return offsets[start], offsets[end - 1] + 1
+
+    def original_substring(self, start: int, end: int) -> str:
+        """The original text behind a [start, end) span of .text"""
+        ostart, oend = self.original_span(start, end)
+        return self.original[ostart:oend]
+
+    def __str__(self):
+        return self.text
+
+
+def _strip_separators(text: str) -> str:
+    # Chained replace beats re.sub / translate on these short runs
+    return text.replace(" ", "").replace(".", "").replace("-", "").replace("_", "").replace("*", "")
+
+
+def _token_bounds(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Expand [start, end) to the surrounding whitespace-delimited token(s)"""
+    left = max(text.rfind(" ", 0, start), text.rfind("\n", 0, start)) + 1
+    right = len(text)
+    for ws in (" ", "\n"):
+        i = text.find(ws, end)
+        if i != -1 and i < right:
+            right = i
+    return left, right
+
+
+def _find_collapsible(folded: str) -> List[Tuple[int, int]]:
+    """Spans of spaced-out words and split phone numbers, in order"""
+    spans = []
+    hint = LETTER_HINT_RE.search(folded)
+    while hint is not None:
+        # Walk letter/separator pairs by hand; cheaper than a lookbehind regex
+        start = hint.start() - 1
+        if start < 0 or folded[start] not in LETTERS or (start and folded[start - 1] in LETTERS):
+            start = hint.start() + 1
+        end = start + 1
+        count = 1
+        while end + 1 < len(folded) and folded[end] in SEPARATOR_CHARS and folded[end + 1] in LETTERS:
+            end += 2
+            count += 1
+        if end < len(folded) and folded[end] in LETTERS:
+            # Last letter starts a real word ("v e r i f y now"); leave it out
+            end -= 2
+            count -= 1
+        if count >= 4:
+            spans.append((start, end))
+            hint = LETTER_HINT_RE.search(folded, end)
+        else:
+            hint = LETTER_HINT_RE.search(folded, hint.start() + 2)
+
+    phones = []
+    for run in DIGIT_RUN_RE.finditer(folded):
+        text = run.group()
+        if text.isdigit():
+            continue
+        start, end = run.span()
+        digits = _strip_separators(text)
+        # Common case: the whole run is one phone number, no regex needed
+        if len(digits) == 10 and digits[0] in "6789":
+            if start and folded[start - 1].isdigit():
+                continue
+        elif len(digits) == 12 and digits.startswith("91") and digits[2] in "6789":
+            if start and folded[start - 1] == "+":
+                start -= 1
+            elif start and folded[start - 1].isdigit():
+                continue
+        else:
+            # Step back one char so a leading "+" of "+91" is included
+            phones.extend([m.span() for m in SPLIT_PHONE_RE.finditer(folded, max(start - 1, 0), end)])
+            continue
+        phones.append((start, end))
+
+    if phones:
+        spans = sorted(spans + phones) if spans else phones
+    return spans
+
+
+def normalize(text: str) -> NormalizedText:
+    """Run the normalization stage once for a message"""
+    # Every FOLD_TABLE key is non-ASCII, so plain ASCII skips the translate
+    if text.isascii() or FOLDABLE_RE.search(text) is None:
+        folded = text
+    else:
+        folded = text.translate(FOLD_TABLE)
+
+    candidates = _find_collapsible(folded)
+    if not candidates:
+        return NormalizedText(folded, text, folded, candidates)
+
+    check_tokens = "@" in folded or "." in folded
+    pieces = []
+    spans = []
+    pos = 0
+    for start, end in candidates:
+        if start < pos:
+            continue
+        if check_tokens:
+            # Separators inside URLs, domains and UPI/email handles are part
+            # of the identifier
+            token = folded[slice(*_token_bounds(folded, start, end))]
+            if "@" in token or "://" in token or DOMAIN_RE.search(token):
+                continue
+        pieces.append(folded[pos:start])
+        pieces.append(_strip_separators(folded[start:end]))
+        spans.append((start, end))
+        pos = end
+
+    if not spans:
+        return NormalizedText(folded, text, folded, spans)
+    pieces.append(folded[pos:])
+    return NormalizedText("".join(pieces), text, folded, spans)
@@ -0,0 +1,149 @@
+"""
+Profiling hooks
+An on-demand stack sampler covering every thread (event loop and
+threadpool workers), plus per-request stage timing that keeps only
+requests slower than the configured threshold.
+"""
+import hmac
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from config import PROFILING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """Samples sys._current_frames() at a fixed interval; one run at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def sample(self, seconds: float, interval_ms: float) -> Optional[Counter]:
+        """Block for `seconds` and return collapsed stack counts, or None if busy"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            seconds = min(seconds, PROFILING_CONFIG["max_profile_seconds"])
+            interval = max(interval_ms, 1) / 1000
+            me = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = Counter()
+
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stacks[self._collapse(names.get(ident, str(ident)), frame)] += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+
+class RequestTrace:
+    """Stage timer for one request; mark() costs a perf_counter call"""
+
+    __slots__ = ("name", "start", "last", "stages")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = self.last = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def finish(self):
+        slow_traces.record(self)
+
+
+class SlowTraceLog:
+    def __init__(self):
+        self.threshold = PROFILING_CONFIG["slow_request_ms"] / 1000
+        self.traces = deque(maxlen=PROFILING_CONFIG["slow_trace_buffer"])
+        self.total_requests = 0
+        self.slow_requests = 0
+        # record() is called from threadpool workers and the event loop
+        self._lock = threading.Lock()
+
+    def record(self, trace: RequestTrace):
+        total = trace.last - trace.start
+        if total < self.threshold:
+            with self._lock:
+                self.total_requests += 1
+            return
+
+        entry = {
+            "name": trace.name,
+            "timestamp": time.time(),
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": {stage: round(t * 1000, 3) for stage, t in trace.stages}
+        }
+        with self._lock:
+            self.total_requests += 1
+            self.slow_requests += 1
+            self.traces.append(entry)
+        logger.warning("Slow request %s: %.1f ms %s", trace.name, entry["total_ms"], entry["stages_ms"])
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "total_requests": self.total_requests,
+                "slow_requests": self.slow_requests,
+                "recent": list(self.traces)
+            }
+
+
+# Initialize profiling state
+sampler = StackSampler()
+slow_traces = SlowTraceLog()
+
+
+# Convenience functions
+def is_admin(token: Optional[str]) -> bool:
+    """Admin endpoints require ADMIN_TOKEN to be set and to match"""
+    expected = PROFILING_CONFIG["admin_token"]
+    if not expected or token is None:
+        return False
+    # compare_digest rejects non-ASCII str. Starlette decodes headers as
+    # latin-1, so encoding back with latin-1 recovers the bytes sent
+    try:
+        received = token.encode("latin-1")
+    except UnicodeEncodeError:
+        received = token.encode("utf-8")
+    return hmac.compare_digest(received, expected.encode("utf-8"))
+
+
+def collapsed_stacks(seconds: float, interval_ms: Optional[float] = None) -> Optional[str]:
+    """Profile the process; returns flamegraph.pl-ready text or None if already running"""
+    if interval_ms is None:
+        interval_ms = PROFILING_CONFIG["sample_interval_ms"]
+    stacks = sampler.sample(seconds, interval_ms)
+    if stacks is None:
+        return None
+    lines: List[str] = [f"{stack} {count}" for stack, count in stacks.most_common()]
+    return "\n".join(lines) + "\n"
+
+
+def get_slow_traces() -> Dict:
+    """Get slow-request stage breakdowns"""
+    return slow_traces.get_stats()
@@ -0,0 +1,150 @@
+"""
+Rate limiting and backpressure for /chat
+Token buckets per session and per client IP, plus a global in-flight cap.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from config import RATE_LIMIT_CONFIG
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by an arbitrary string, refilled lazily on check"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int):
+        self.rate = rate
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        # key -> [tokens, last_refill]; LRU order so idle keys fall off the front
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def allow(self, key: str, now: Optional[float] = None) -> bool:
+        """Take one token for key; False if the bucket is empty"""
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._buckets.move_to_end(key)
+                tokens = bucket[0] + (now - bucket[1]) * self.rate
+                bucket[0] = tokens if tokens < self.burst else self.burst
+                bucket[1] = now
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                self.allowed += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def get_stats(self) -> Dict:
+        return {
+            "tracked_keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted
+        }
+
+
+class InFlightLimiter:
+    """Global cap on concurrent requests; excess is shed instead of queued"""
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.peak = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            if self.in_flight > self.peak:
+                self.peak = self.in_flight
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak,
+            "max_in_flight": self.max_in_flight,
+            "shed": self.shed
+        }
+
+
+# Initialize limiters
+session_limiter = TokenBucketLimiter(
+    RATE_LIMIT_CONFIG["session_rate_per_second"],
+    RATE_LIMIT_CONFIG["session_burst"],
+    RATE_LIMIT_CONFIG["max_tracked_keys"]
+)
+ip_limiter = TokenBucketLimiter(
+    RATE_LIMIT_CONFIG["ip_rate_per_second"],
+    RATE_LIMIT_CONFIG["ip_burst"],
+    RATE_LIMIT_CONFIG["max_tracked_keys"]
+)
+in_flight_limiter = InFlightLimiter(RATE_LIMIT_CONFIG["max_in_flight"])
+
+
+# Convenience functions
+@contextmanager
+def admit(session_id: str, ip: Optional[str]):
+    """Yield True if the request may proceed, False if it should be stalled"""
+    if not in_flight_limiter.try_acquire():
+        yield False
+        return
+
+    try:
+        # Check the IP first so a flood across many session ids is still caught
+        allowed = (ip is None or ip_limiter.allow(ip)) \
+            and session_limiter.allow(session_id)
+        yield allowed
+    finally:
+        in_flight_limiter.release()
+
+
+def client_ip(peer: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+    """Resolve the client IP, honouring X-Forwarded-For from trusted proxies only"""
+    trusted = RATE_LIMIT_CONFIG["trusted_proxies"]
+    if not forwarded_for or not trusted or ("*" not in trusted and peer not in trusted):
+        return peer
+
+    # Proxies append, so walk from the right past any trusted hops
+    hops = [h.strip() for h in forwarded_for.split(",") if h.strip()]
+    if "*" in trusted:
+        return hops[-1] if hops else peer
+    for hop in reversed(hops):
+        if hop not in trusted:
+            return hop
+    return hops[0] if hops else peer
+
+
+def get_rate_limit_stats() -> Dict:
+    """Get limiter counters"""
+    return {
+        "session": session_limiter.get_stats(),
+        "ip": ip_limiter.get_stats(),
+        "in_flight": in_flight_limiter.get_stats()
+    }
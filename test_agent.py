@@ -0,0 +1,56 @@
+from config import AGENT_CONFIG
+from agent import advance_state
+
+MAX_DWELL = AGENT_CONFIG["max_state_dwell"]
+STALL_TURNS = AGENT_CONFIG["stall_turns"]
+PERSONA_EVERY = AGENT_CONFIG["persona_switch_interval"]
+
+
+def _session(state="confused", dwell=0, turn=1):
+    # advance_state numbers the turn as len(history) + 1
+    return {"history": [("", "")] * (turn - 1), "state": state, "dwell": dwell}
+
+
+def _step(session, extracted=None):
+    advance_state(session, extracted or {})
+    session["history"].append(("", ""))
+    return session["state"]
+
+
+def test_dwell_limit_enters_stall_then_resumes_confused():
+    session = _session()
+    states = [_step(session) for _ in range(MAX_DWELL + STALL_TURNS + 1)]
+    assert states[:MAX_DWELL] == ["confused"] * MAX_DWELL
+    assert states[MAX_DWELL:MAX_DWELL + STALL_TURNS] == ["stalling"] * STALL_TURNS
+    assert states[-1] == "confused"
+    assert session["dwell"] == 1
+
+
+def test_link_and_payment_override_current_state():
+    session = _session()
+    assert _step(session, {"links": ["http://x.test"]}) == "cooperative"
+    assert _step(session, {"upi": ["a@okaxis"]}) == "verifying"
+    # Payment wins when both arrive together
+    session = _session()
+    assert _step(session, {"links": ["http://x.test"], "bank_accounts": ["123456789012"]}) == "verifying"
+
+
+def test_stall_runs_its_course_before_signals_apply():
+    session = _session("stalling", dwell=1)
+    assert _step(session, {"upi": ["a@okaxis"]}) == "stalling"
+    assert _step(session, {"upi": ["a@okaxis"]}) == "verifying"
+
+
+def test_repeated_upi_still_stalls():
+    session = _session()
+    states = [_step(session, {"upi": ["a@okaxis"]}) for _ in range(MAX_DWELL + 1)]
+    assert states[:MAX_DWELL] == ["verifying"] * MAX_DWELL
+    assert states[-1] == "stalling"
+
+
+def test_persona_boundary_rotates_state():
+    session = _session("cooperative", turn=PERSONA_EVERY - 1)
+    assert _step(session) == "cooperative"
+    assert _step(session) == "verifying"
+    assert session["dwell"] == 1
+    assert _step(session) == "verifying"
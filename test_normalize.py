@@ -0,0 +1,46 @@
+from extractor import extract_intel
+from normalize import normalize
+
+
+def test_folds_homoglyphs_fullwidth_and_invisible():
+    assert normalize("Your КҮС is bl​ocked").text == "Your KYC is blocked"
+    assert normalize("Pay ₨500 to ｒａｍ＠ｏｋｓｂｉ ９８７６５４３２１０").text == "Pay ₹500 to ram@oksbi 9876543210"
+    assert normalize("call ९८७६५४३२१०").text == "call 9876543210"
+
+
+def test_collapses_spaced_letters_and_split_phones():
+    assert normalize("v e r i f y now 98765 43210").text == "verify now 9876543210"
+    assert normalize("Call +91.98765.43210").text == "Call +919876543210"
+    assert normalize("Pay 500 98765 43210").text == "Pay 500 9876543210"
+
+
+def test_leaves_ordinary_text_alone():
+    for text in ["I am a good boy", "Pay 500 to 123456789012 now", "Hello, how are you?"]:
+        assert normalize(text).text == text
+
+
+def test_does_not_collapse_inside_links_or_handles():
+    assert normalize("go to https://x-y-z-w.com/login").text == "go to https://x-y-z-w.com/login"
+    assert normalize("pay a.b.c.d@ybl now").text == "pay a.b.c.d@ybl now"
+    assert normalize("visit www.a-b-c-d.com, now").text == "visit www.a-b-c-d.com, now"
+    assert normalize("open a-b-c-d.in/x").text == "open a-b-c-d.in/x"
+
+
+def test_offsets_round_trip():
+    original = "x​ 98765 43210 v e r i f y"
+    n = normalize(original)
+    assert n.text == "x 9876543210 verify"
+
+    i = n.text.index("9876543210")
+    assert n.original_substring(i, i + 10) == "98765 43210"
+    i = n.text.index("verify")
+    assert n.original_substring(i, i + 6) == "v e r i f y"
+    assert n.original_span(0, 1) == (0, 1)
+
+
+def test_extracted_links_and_upi_are_reported_as_sent():
+    n = normalize("Login at https://pаypal.com/x now")  # Cyrillic "а"
+    assert n.text == "Login at https://paypal.com/x now"
+    assert extract_intel(n)["links"] == ["https://pаypal.com/x"]
+    assert extract_intel(normalize("pay a.b.c.d@ybl"))["upi"] == ["a.b.c.d@ybl"]
+    assert extract_intel(normalize("Pay ｒａｍ＠ｏｋｓｂｉ"))["upi"] == ["ｒａｍ＠ｏｋｓｂｉ"]
@@ -0,0 +1,77 @@
+from config import RATE_LIMIT_CONFIG
+import ratelimit
+from ratelimit import InFlightLimiter, TokenBucketLimiter, client_ip
+
+
+def test_bucket_allows_burst_then_rejects():
+    limiter = TokenBucketLimiter(rate=1.0, burst=3, max_keys=10)
+    assert [limiter.allow("s", now=0.0) for _ in range(4)] == [True, True, True, False]
+    assert limiter.get_stats()["rejected"] == 1
+
+
+def test_bucket_refills_lazily_up_to_burst():
+    limiter = TokenBucketLimiter(rate=2.0, burst=2, max_keys=10)
+    assert limiter.allow("s", now=0.0)
+    assert limiter.allow("s", now=0.0)
+    assert not limiter.allow("s", now=0.0)
+    assert limiter.allow("s", now=0.5)
+    assert not limiter.allow("s", now=0.5)
+    # A long idle period never banks more than the burst
+    assert [limiter.allow("s", now=100.0) for _ in range(3)] == [True, True, False]
+
+
+def test_buckets_are_per_key_and_bounded():
+    limiter = TokenBucketLimiter(rate=0.0, burst=1, max_keys=2)
+    assert limiter.allow("a", now=0.0)
+    assert not limiter.allow("a", now=0.0)
+    assert limiter.allow("b", now=0.0)
+    assert limiter.allow("c", now=0.0)
+    stats = limiter.get_stats()
+    assert stats["tracked_keys"] == 2
+    assert stats["evicted"] == 1
+
+
+def test_in_flight_limiter_sheds_above_cap():
+    limiter = InFlightLimiter(2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+    assert limiter.get_stats()["shed"] == 1
+
+
+def test_client_ip_ignores_forwarded_for_from_untrusted_peers(monkeypatch):
+    monkeypatch.setitem(RATE_LIMIT_CONFIG, "trusted_proxies", [])
+    assert client_ip("10.0.0.1", "1.2.3.4") == "10.0.0.1"
+
+    monkeypatch.setitem(RATE_LIMIT_CONFIG, "trusted_proxies", ["10.0.0.1"])
+    assert client_ip("10.0.0.9", "1.2.3.4") == "10.0.0.9"
+    assert client_ip("10.0.0.1", "6.6.6.6, 1.2.3.4") == "1.2.3.4"
+    assert client_ip("10.0.0.1", "1.2.3.4, 10.0.0.1") == "1.2.3.4"
+
+    monkeypatch.setitem(RATE_LIMIT_CONFIG, "trusted_proxies", ["*"])
+    assert client_ip("172.16.0.5", "6.6.6.6, 1.2.3.4") == "1.2.3.4"
+
+
+def test_admit_releases_in_flight_slot_on_both_paths(monkeypatch):
+    monkeypatch.setattr(ratelimit, "in_flight_limiter", InFlightLimiter(1))
+    monkeypatch.setattr(ratelimit, "session_limiter", TokenBucketLimiter(rate=0.0, burst=1, max_keys=10))
+    monkeypatch.setattr(ratelimit, "ip_limiter", TokenBucketLimiter(rate=0.0, burst=10, max_keys=10))
+
+    with ratelimit.admit("s", "1.2.3.4") as allowed:
+        assert allowed
+        assert ratelimit.in_flight_limiter.in_flight == 1
+    assert ratelimit.in_flight_limiter.in_flight == 0
+
+    with ratelimit.admit("s", "1.2.3.4") as allowed:
+        assert not allowed
+    assert ratelimit.in_flight_limiter.in_flight == 0
+
+    # Also released when the request body raises
+    try:
+        with ratelimit.admit("other", "1.2.3.4"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert ratelimit.in_flight_limiter.in_flight == 0
@@ -0,0 +1,48 @@
+from timeseries import RingSeries, TimeSeriesMetrics
+
+
+def values(points):
+    return [p["value"] for p in points]
+
+
+def test_slot_is_recycled_for_a_newer_bucket():
+    ring = RingSeries(width=60, size=3)
+    ring.add(0, {"messages": 2})
+    ring.add(180, {"messages": 1})  # same slot, three buckets later
+    assert values(ring.query("messages", 0, 0)) == [0]
+    assert values(ring.query("messages", 180, 180)) == [1]
+
+
+def test_late_event_is_dropped_without_wiping_newer_bucket():
+    ring = RingSeries(width=60, size=3)
+    ring.add(600, {"messages": 5})
+    ring.add(420, {"messages": 1})  # maps to the same slot as 600
+    assert values(ring.query("messages", 600, 600)) == [5]
+    assert values(ring.query("messages", 420, 420)) == [0]
+
+
+def test_query_is_clamped_to_ring_size():
+    ring = RingSeries(width=60, size=3)
+    for ts in (0, 60, 120, 180, 240):
+        ring.add(ts, {"messages": 1})
+    points = ring.query("messages", 0, 240)
+    assert [p["t"] for p in points] == [120, 180, 240]
+    assert values(points) == [1, 1, 1]
+
+
+def test_events_counted_into_every_resolution():
+    metrics = TimeSeriesMetrics()
+    metrics.record_event({"type": "turn", "scam": True, "extracted": {"upi": ["a@ok", "b@ok"]}, "ts": 3600 * 5 + 30})
+    metrics.record_event({"type": "throttled", "ts": 3600 * 5 + 90})
+    end = 3600 * 6
+    assert metrics.query("messages", "minute", end=end)["total"] == 1
+    assert metrics.query("upi", "hour", end=end)["total"] == 2
+    assert metrics.query("throttled", "day", end=end)["total"] == 1
+
+
+def test_explicit_end_zero_is_not_now():
+    metrics = TimeSeriesMetrics()
+    metrics.record_event({"type": "turn", "ts": 10})
+    result = metrics.query("messages", "minute", end=0, window=60)
+    assert [p["t"] for p in result["points"]] == [-60, 0]
+    assert result["total"] == 1
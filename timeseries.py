@@ -0,0 +1,144 @@
+"""
+Sliding-window time-series metrics
+Per-minute, hourly and daily buckets held in fixed-size ring arrays, so
+memory is bounded and range queries cost O(buckets). Each event is counted
+into all three rings directly rather than rolled up from the minute ring.
+"""
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from config import TIMESERIES_CONFIG
+
+SERIES = [
+    "messages",
+    "scam_messages",
+    "throttled",
+    "upi",
+    "links",
+    "phones",
+    "bank_accounts",
+]
+
+RESOLUTIONS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+class RingSeries:
+    """One resolution: a ring of buckets, each holding a counter per series"""
+
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.size = size
+        # Bucket number (epoch // width) currently held in each slot; -1 = empty
+        self.stamps = array("q", [-1]) * size
+        self.counts = {name: array("L", [0]) * size for name in SERIES}
+
+    def _slot(self, bucket: int) -> Optional[int]:
+        slot = bucket % self.size
+        stamp = self.stamps[slot]
+        if stamp == bucket:
+            return slot
+        if bucket < stamp:
+            # Late event for a bucket the ring has already moved past
+            return None
+        # Slot holds an expired bucket; recycle it
+        self.stamps[slot] = bucket
+        for counts in self.counts.values():
+            counts[slot] = 0
+        return slot
+
+    def add(self, ts: float, increments: Dict[str, int]):
+        slot = self._slot(int(ts // self.width))
+        if slot is None:
+            return
+        for name, n in increments.items():
+            self.counts[name][slot] += n
+
+    def query(self, name: str, start: float, end: float) -> List[Dict]:
+        first = int(start // self.width)
+        last = int(end // self.width)
+        # Never walk further back than the ring can hold
+        first = max(first, last - self.size + 1)
+
+        counts = self.counts[name]
+        points = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.size
+            value = counts[slot] if self.stamps[slot] == bucket else 0
+            points.append({"t": bucket * self.width, "value": value})
+        return points
+
+
+class TimeSeriesMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rings = {
+            name: RingSeries(width, TIMESERIES_CONFIG[f"{name}_buckets"])
+            for name, width in RESOLUTIONS.items()
+        }
+
+    def record_event(self, event: Dict):
+        """Count an event from the event bus into every resolution"""
+        increments = {}
+        if event.get("type") == "throttled":
+            increments["throttled"] = 1
+        elif event.get("type") == "turn":
+            increments["messages"] = 1
+            if event.get("scam"):
+                increments["scam_messages"] = 1
+            for key, items in event.get("extracted", {}).items():
+                if key in SERIES and items:
+                    increments[key] = len(items)
+        else:
+            return
+
+        ts = event.get("ts", time.time())
+        with self._lock:
+            for ring in self.rings.values():
+                ring.add(ts, increments)
+
+    def query(self, series: str, resolution: str = "minute",
+              start: Optional[float] = None, end: Optional[float] = None,
+              window: Optional[float] = None) -> Dict:
+        """Return bucketed counts for a series between start and end (epoch seconds)
+
+        window (seconds before end) is used when start is not given.
+        """
+        if series not in SERIES:
+            raise ValueError(f"Unknown series: {series}")
+        if resolution not in self.rings:
+            raise ValueError(f"Unknown resolution: {resolution}")
+
+        ring = self.rings[resolution]
+        if end is None:
+            end = time.time()
+        if start is None:
+            start = end - (window if window is not None else ring.width * ring.size)
+
+        with self._lock:
+            points = ring.query(series, start, end)
+
+        return {
+            "series": series,
+            "resolution": resolution,
+            "bucket_seconds": ring.width,
+            "total": sum(p["value"] for p in points),
+            "points": points
+        }
+
+
+# Initialize time-series tracker
+timeseries_tracker = TimeSeriesMetrics()
+
+
+# Convenience functions
+def get_timeseries(series: str, resolution: str = "minute",
+                   start: Optional[float] = None, end: Optional[float] = None,
+                   window: Optional[float] = None) -> Dict:
+    """Get bucketed counts for one series"""
+    return timeseries_tracker.query(series, resolution, start, end, window)